@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import os
+import threading
 import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import graphql
 import magql
@@ -39,11 +43,40 @@ class MagqlExtension:
     .. __: https://github.com/jaydenseric/graphql-multipart-request-spec
     .. __: https://github.com/graphql/graphiql/tree/main/packages/graphiql#readme
 
+    Set the ``MAGQL_BATCH_PARALLEL`` Flask config key to ``True`` to execute
+    the operations in a batched request concurrently in a thread pool. Leave it
+    disabled if resolvers share resources that are not thread-safe, such as a
+    SQLAlchemy session.
+
+    Set the ``MAGQL_BATCH_DEDUP`` Flask config key to ``True`` to execute
+    repeated identical operations in a batched request only once, with each
+    repeat sharing the one result. Leave it disabled if repeated operations
+    must be executed separately, such as repeated mutations.
+
+    If the ``msgpack`` package is installed, requests may also be sent as
+    msgpack with the ``application/msgpack`` content type. Responses are
+    always JSON.
+
     :param schema: The schema to serve.
     :param decorators: View decorators applied to each view function. This can
         be used to apply authentication, CORS, etc.
     """
 
+    __slots__ = (
+        "schema",
+        "blueprint",
+        "decorators",
+        "_views",
+        "_decorated_views",
+        "_get_context",
+        "_executor",
+        "_executor_lock",
+        "_schema_document",
+        "_schema_etag",
+        "_page_cache",
+        "_document_cache",
+    )
+
     def __init__(
         self,
         schema: magql.Schema,
@@ -67,32 +100,44 @@ class MagqlExtension:
         a URL prefix: ``me.blueprint.url_prefix = "/api"``.
         """
 
+        # Bind the extension into each view instead of looking it up in
+        # current_app.extensions on every request.
+        self._views: dict[str, t.Callable[..., ResponseReturnValue]] = {
+            "graphql": partial(_views.graphql, self),
+            "schema": partial(_views.schema, self),
+            "graphiql": partial(_views.graphiql, self),
+            "conveyor": partial(_views.conveyor, self),
+        }
+        self._decorated_views = dict(self._views)
+        view_funcs = {name: _MagqlView(self, name) for name in self._views}
+
         self.blueprint.add_url_rule(
             "/graphql",
             methods=["POST"],
             endpoint="graphql",
-            view_func=_views.graphql,
+            view_func=view_funcs["graphql"],
         )
         self.blueprint.add_url_rule(
             "/schema.graphql",
             endpoint="schema",
-            view_func=_views.schema,
+            view_func=view_funcs["schema"],
         )
         self.blueprint.add_url_rule(
             "/graphiql",
             endpoint="graphiql",
-            view_func=_views.graphiql,
+            view_func=view_funcs["graphiql"],
         )
+        # The path converter can't match an empty string, so the bare rule is
+        # registered as well. The view's default handles the missing argument.
         self.blueprint.add_url_rule(
             "/conveyor/",
             endpoint="conveyor",
-            view_func=_views.conveyor,
-            defaults={"path": ""},
+            view_func=view_funcs["conveyor"],
         )
         self.blueprint.add_url_rule(
             "/conveyor/<path:path>",
             endpoint="conveyor",
-            view_func=_views.conveyor,
+            view_func=view_funcs["conveyor"],
         )
 
         if decorators is None:
@@ -100,10 +145,30 @@ class MagqlExtension:
 
         self.decorators = decorators
         """View decorators to apply to each view function. This can be used to
-        apply authentication, CORS, etc.
+        apply authentication, CORS, etc. The decorators are applied during
+        :meth:`init_app`, so they must be added before then.
         """
 
         self._get_context: t.Callable[[], t.Any] = _default_fsa_context
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self._schema_document: str | None = None
+        self._schema_etag: str | None = None
+        self._page_cache: dict[tuple[Flask, str], tuple[str, bytes]] = {}
+        self._document_cache: dict[str, graphql.DocumentNode] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool used to execute batched operations when the
+        ``MAGQL_BATCH_PARALLEL`` config is enabled. Created on first use.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=min(8, (os.cpu_count() or 1) * 2),
+                    thread_name_prefix="flask_magql",
+                )
+
+        return self._executor
 
     def init_app(self, app: Flask) -> None:
         """Register the GraphQL API on the given Flask app.
@@ -113,6 +178,12 @@ class MagqlExtension:
 
         :param app: The app to register on.
         """
+        for name, f in self._views.items():
+            for d in self.decorators:
+                f = d(f)
+
+            self._decorated_views[name] = f
+
         app.extensions["magql"] = self
         app.register_blueprint(self.blueprint)
 
@@ -132,6 +203,9 @@ class MagqlExtension:
         """Execute a GraphQL operation (query or mutation). The SQLAlchemy
         session is passed as the context.
 
+        The parsed and validated document for each source string is cached, so
+        repeated operations don't pay for parsing again.
+
         :param source: The operation (query or mutation) written in GraphQL
             language to execute on the schema.
         :param variables: Maps placeholder names in the source to input values
@@ -139,20 +213,66 @@ class MagqlExtension:
         :param operation: The name of the operation if the source defines
             multiple.
         """
-        context = self._get_context()
-        return self.schema.execute(
-            source=source,
-            context=context,
-            variables=variables,
-            operation=operation,
+        context = _views._request_context.get()
+
+        if context is _views._UNSET:
+            context = self._get_context()
+
+        gql_schema = self.schema.to_graphql()
+        document = self._document_cache.get(source)
+
+        if document is None:
+            try:
+                document = graphql.parse(source)
+            except graphql.GraphQLError as error:
+                return graphql.ExecutionResult(data=None, errors=[error])
+
+            errors = graphql.validate(gql_schema, document)
+
+            if errors:
+                return graphql.ExecutionResult(data=None, errors=errors)
+
+            # Only cache documents that parsed and validated, and keep the
+            # cache bounded in case a client generates unique queries.
+            if len(self._document_cache) < 1024:
+                self._document_cache[source] = document
+
+        return graphql.execute_sync(
+            gql_schema,
+            document,
+            context_value=context,
+            variable_values=variables,
+            operation_name=operation,
         )
 
 
+class _MagqlView:
+    """The callable registered as the view function for an endpoint. It
+    dispatches to the decorated view built by :meth:`MagqlExtension.init_app`,
+    so the decorator chain is not rebuilt on every request.
+
+    :param ext: The extension holding the decorated views.
+    :param name: The endpoint name to dispatch to.
+    """
+
+    __slots__ = ("__name__", "_ext", "_name")
+
+    def __init__(self, ext: MagqlExtension, name: str) -> None:
+        self._ext = ext
+        self._name = name
+        self.__name__ = name
+
+    def __call__(self, **kwargs: t.Any) -> ResponseReturnValue:
+        return self._ext._decorated_views[self._name](**kwargs)
+
+
 def _default_fsa_context() -> dict[str, t.Any] | None:
-    """Use the Flask-SQLAlchemy(-Lite) session."""
-    try:
-        db = current_app.extensions["sqlalchemy"]
-    except KeyError:
+    """Use the Flask-SQLAlchemy(-Lite) session. Looked up on the current app
+    each time, since one extension may serve multiple apps.
+    """
+    db = current_app.extensions.get("sqlalchemy")
+
+    if db is None:
         return None
 
     return {"sa_session": db.session}
@@ -28,12 +28,14 @@ def map_files_to_operations(
     :param files: Map of multipart keys to files. Flask's ``request.files``.
     """
     for files_key, paths in file_map.items():
+        file = files[files_key]
+
         for path_str in paths:
             *path, last = path_str.split(".")
-            current = operations
+            current: t.Any = operations
 
             for part in path:
-                if isinstance(current, list):
+                if type(current) is list:
                     # The first part in the path for multiple operations is an index
                     # into the list of operations.
                     current = current[int(part)]
@@ -41,9 +43,9 @@ def map_files_to_operations(
                     current = current[part]
 
             # Replace the null value pointed to by the path with the file.
-            if isinstance(current, list):
+            if type(current) is list:
                 # The last part in a path pointing at a list-type argument is an index
                 # into the list of values.
-                current[int(last)] = files[files_key]
+                current[int(last)] = file
             else:
-                current[last] = files[files_key]
+                current[last] = file
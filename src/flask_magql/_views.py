@@ -1,80 +1,212 @@
 from __future__ import annotations
 
-import collections.abc as c
+import gzip
+import hashlib
 import traceback
 import typing as t
-from functools import wraps
+from contextvars import ContextVar
+from functools import partial
 
+from flask import copy_current_request_context
 from flask import current_app
 from flask import render_template
 from flask import request
+from flask import Response
 from flask.typing import ResponseReturnValue
+from graphql import ExecutionResult
 from graphql import GraphQLError
-from werkzeug.sansio.response import Response
+from werkzeug.exceptions import BadRequest
 
 from ._files import map_files_to_operations
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None  # type: ignore[assignment]
+
 if t.TYPE_CHECKING:
     from ._extension import MagqlExtension
 
+_UNSET = object()
+
+_request_context: ContextVar[t.Any] = ContextVar(
+    "flask_magql.request_context", default=_UNSET
+)
+"""The context value shared by every operation in the current request. Set
+once by the GraphQL view so a batch doesn't call the context provider per
+operation. Worker threads for parallel batches set it to the same value, since
+threads don't inherit contextvars."""
+
 
-def _get_magql_ext() -> MagqlExtension:
-    """Get the Magql extension for the current app."""
-    return current_app.extensions["magql"]  # type: ignore[no-any-return]
+# orjson parses and serializes JSON significantly faster than the stdlib.
+# Use it if it's installed, otherwise fall back to the app's JSON provider.
+if orjson is not None:
 
+    def _loads(s: str | bytes) -> t.Any:
+        return orjson.loads(s)
 
-def _apply_ext_decorators(
-    f: c.Callable[..., ResponseReturnValue],
-) -> c.Callable[..., ResponseReturnValue]:
-    """Apply the extension's decorators to a view function."""
+    def _json_response(payload: t.Any) -> Response:
+        return Response(orjson.dumps(payload), mimetype="application/json")
 
-    @wraps(f)
-    def view(**kwargs: t.Any) -> ResponseReturnValue:
-        ext = _get_magql_ext()
-        decorated = f
+else:
 
-        for d in ext.decorators:
-            decorated = d(decorated)
+    def _loads(s: str | bytes) -> t.Any:
+        return current_app.json.loads(s)
 
-        return decorated(**kwargs)
+    def _json_response(payload: t.Any) -> Response:
+        return current_app.json.response(payload)
 
-    return view
 
+def graphql(ext: MagqlExtension) -> tuple[Response, int]:
+    # Checking the raw header prefix avoids parsing the full content type with
+    # its parameters the way request.mimetype does.
+    content_type = request.environ.get("CONTENT_TYPE", "")
+    mimetype = content_type[:19].lower()
 
-@_apply_ext_decorators
-def graphql() -> tuple[Response, int]:
-    if request.mimetype == "multipart/form-data":
-        operations = current_app.json.loads(request.form["operations"])
-        file_map = current_app.json.loads(request.form["map"])
+    if mimetype == "multipart/form-data":
+        operations = _loads(request.form["operations"])
+        file_map = _loads(request.form["map"])
         map_files_to_operations(operations, file_map, request.files)
+    elif msgpack is not None and mimetype == "application/msgpack":
+        # All of msgpack's unpack errors subclass ValueError. Treat a bad body
+        # the same as malformed JSON rather than raising a 500.
+        try:
+            operations = msgpack.unpackb(request.get_data())
+        except ValueError as e:
+            raise BadRequest("Failed to decode msgpack object.") from e
     else:
         operations = request.get_json(silent=False)
 
-    is_single = not isinstance(operations, list)
+    context = ext._get_context()
+    token = _request_context.set(context)
+
+    try:
+        if not isinstance(operations, list):
+            # A single operation doesn't need the batch machinery. Execute it
+            # and respond with its result directly.
+            result = _execute_operation(ext, operations)
+            status = 200
+
+            if result.errors is not None:
+                status = _handle_errors(result.errors, status)
+
+            return _json_response(result.formatted), status
+
+        if len(operations) > 1 and current_app.config.get("MAGQL_BATCH_DEDUP"):
+            operations, result_map = _dedup_operations(operations)
+        else:
+            result_map = list(range(len(operations)))
+
+        if len(operations) > 1 and current_app.config.get("MAGQL_BATCH_PARALLEL"):
+            # Each worker thread gets a copy of the request context so that
+            # current_app and request work in resolvers, and sets the shared
+            # execution context since contextvars don't cross threads.
+            executor = ext._get_executor()
+            futures = [
+                executor.submit(
+                    copy_current_request_context(
+                        partial(_execute_in_context, ext, op, context)
+                    )
+                )
+                for op in operations
+            ]
+            result_list = [future.result() for future in futures]
+        else:
+            result_list = [_execute_operation(ext, op) for op in operations]
+
+        status = 200
+
+        for result in result_list:
+            if result.errors is not None:
+                status = _handle_errors(result.errors, status)
+
+        formatted = [result.formatted for result in result_list]
+        results = [formatted[i] for i in result_map]
+        return _json_response(results), status
+    finally:
+        _request_context.reset(token)
+
+
+def _execute_operation(
+    ext: MagqlExtension, operation: dict[str, t.Any]
+) -> ExecutionResult:
+    """Execute one operation from a request against the extension's schema.
+
+    :param ext: The extension with the schema to execute against.
+    :param operation: The operation's query, variables, and name.
+    """
+    return ext.execute(
+        source=operation["query"],
+        variables=operation.get("variables"),
+        operation=operation.get("operationName"),
+    )
+
+
+def _execute_in_context(
+    ext: MagqlExtension, operation: dict[str, t.Any], context: t.Any
+) -> ExecutionResult:
+    """Execute one operation in a worker thread with the request's shared
+    context value set, matching what :func:`_execute_operation` sees in the
+    view's own thread.
+
+    :param ext: The extension with the schema to execute against.
+    :param operation: The operation's query, variables, and name.
+    :param context: The context value the view got from the provider.
+    """
+    token = _request_context.set(context)
+
+    try:
+        return _execute_operation(ext, operation)
+    finally:
+        _request_context.reset(token)
+
 
-    if is_single:
-        operations = [operations]
+def _dedup_operations(
+    operations: list[dict[str, t.Any]],
+) -> tuple[list[dict[str, t.Any]], list[int]]:
+    """Collapse repeated operations in a batch so each unique operation is only
+    executed once. Used when the ``MAGQL_BATCH_DEDUP`` config is enabled.
 
-    ext = _get_magql_ext()
-    results = []
-    status = 200
+    Operations with unhashable variable values, such as lists or nested dicts,
+    are not deduplicated.
+
+    :param operations: The full list of operations from the request.
+    :return: The unique operations to execute, and for each original operation
+        the index of its result in the executed list.
+    """
+    seen: dict[t.Any, int] = {}
+    unique: list[dict[str, t.Any]] = []
+    result_map: list[int] = []
 
     for operation in operations:
-        result = ext.execute(
-            source=operation["query"],
-            variables=operation.get("variables"),
-            operation=operation.get("operationName"),
-        )
+        variables = operation.get("variables")
+
+        try:
+            key = (
+                operation["query"],
+                operation.get("operationName"),
+                frozenset(variables.items()) if variables else None,
+            )
+            index = seen.get(key)
+        except TypeError:
+            key = None
+            index = None
 
-        if result.errors is not None:
-            status = _handle_errors(result.errors, status)
+        if index is None:
+            index = len(unique)
+            unique.append(operation)
 
-        results.append(result.formatted)
+            if key is not None:
+                seen[key] = index
 
-    if is_single:
-        return current_app.json.response(results[0]), status
+        result_map.append(index)
 
-    return current_app.json.response(results), status
+    return unique, result_map
 
 
 def _handle_errors(errors: list[GraphQLError], status: int) -> int:
@@ -87,8 +219,13 @@ def _handle_errors(errors: list[GraphQLError], status: int) -> int:
     :param status: The current status code.
     """
     current_status = 400
+    # Resolve the app proxy once rather than once per error.
+    debug = current_app.debug
+    logger = current_app.logger
 
-    # Set status to 500 for non-GraphQL exceptions. Log the traceback.
+    # Set status to 500 for non-GraphQL exceptions. Log the traceback. Every
+    # error is processed even once the status is known, since each internal
+    # error's message must be rewritten and its traceback logged.
     for error in errors:
         oe = error.original_error
 
@@ -98,35 +235,74 @@ def _handle_errors(errors: list[GraphQLError], status: int) -> int:
             error.message = "Internal Server Error"
 
             # In debug mode, add the traceback to the result.
-            if current_app.debug:
-                error.extensions = {
-                    "traceback": "\n".join(
-                        traceback.format_exception(type(oe), oe, oe.__traceback__)
-                    )
-                }
+            if debug:
+                tb = traceback.TracebackException(type(oe), oe, oe.__traceback__)
+                error.extensions = {"traceback": "".join(tb.format())}
 
-            current_app.logger.error(
-                f"Exception on GraphQL field {error.path}", exc_info=oe
-            )
+            logger.error(f"Exception on GraphQL field {error.path}", exc_info=oe)
 
     # If a previous operation set 500, don't set 400.
-    if current_status > status:
-        return current_status
+    return max(current_status, status)
+
 
-    return status
+def schema(ext: MagqlExtension) -> ResponseReturnValue:
+    document = ext._schema_document
+    etag = ext._schema_etag
 
+    if document is None or etag is None:
+        # The document is a pure function of the schema, which doesn't change
+        # at runtime. Generate it once and compute an ETag for it.
+        document = ext.schema.to_document()
+        etag = hashlib.blake2b(document.encode(), digest_size=16).hexdigest()
+        ext._schema_document = document
+        ext._schema_etag = etag
+
+    # The header value is the quoted form required by RFC 7232. Werkzeug
+    # parses If-None-Match into unquoted tags for the comparison.
+    if request.if_none_match.contains(etag):
+        return "", 304, {"ETag": f'"{etag}"'}
+
+    return document, {"Content-Type": "text/plain", "ETag": f'"{etag}"'}
+
+
+def _render_page(ext: MagqlExtension, template: str) -> ResponseReturnValue:
+    """Render a UI page, caching the result along with a precompressed copy
+    served to clients that accept gzip. The pages are static per deployment,
+    but the GraphQL URL rendered into them depends on the app's URL map, so
+    the cache is keyed by app as well. In debug mode the template is rendered
+    fresh each request so edits show up.
+
+    :param ext: The extension holding the page cache.
+    :param template: The name of the template to render.
+    """
+    if current_app.debug:
+        return render_template(template)
+
+    app = current_app._get_current_object()  # type: ignore[attr-defined]
+    key = (app, template)
+    cached = ext._page_cache.get(key)
+
+    if cached is None:
+        page = render_template(template)
+        cached = ext._page_cache[key] = (page, gzip.compress(page.encode()))
+
+    page, page_gz = cached
+
+    # Both variants vary on Accept-Encoding so caches don't serve the gzip
+    # body to a client that didn't ask for it, or vice versa.
+    if request.accept_encodings.quality("gzip") > 0:
+        return Response(
+            page_gz,
+            mimetype="text/html",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
 
-@_apply_ext_decorators
-def schema() -> tuple[str, dict[str, str]]:
-    ext = _get_magql_ext()
-    return ext.schema.to_document(), {"Content-Type": "text/plain"}
+    return page, {"Vary": "Accept-Encoding"}
 
 
-@_apply_ext_decorators
-def graphiql() -> str:
-    return render_template("magql/graphiql.html")
+def graphiql(ext: MagqlExtension) -> ResponseReturnValue:
+    return _render_page(ext, "magql/graphiql.html")
 
 
-@_apply_ext_decorators
-def conveyor(path: str) -> str:
-    return render_template("magql/conveyor.html")
+def conveyor(ext: MagqlExtension, path: str = "") -> ResponseReturnValue:
+    return _render_page(ext, "magql/conveyor.html")
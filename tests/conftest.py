@@ -4,13 +4,29 @@ import typing as t
 
 import graphql
 import magql
+import orjson
 import pytest
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask.testing import FlaskClient
 from werkzeug.test import TestResponse
 
 from flask_magql import MagqlExtension
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, so these tests exercise the extension
+    with a faster provider than the stdlib default. The Flask-SQLAlchemy tests
+    keep the default provider, covering both.
+    """
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s: str | bytes, **kwargs: t.Any) -> t.Any:
+        return orjson.loads(s)
+
+
 basic_schema = magql.Schema()
 
 
@@ -38,6 +54,7 @@ def ext(schema: magql.Schema) -> MagqlExtension:
 def create_app(ext: MagqlExtension) -> t.Callable[[], Flask]:
     def create_app() -> Flask:
         app = Flask(__name__)
+        app.json = OrjsonProvider(app)
         ext.init_app(app)
         return app
 
@@ -54,6 +71,13 @@ def client(app: Flask) -> FlaskClient:
     return app.test_client()
 
 
+def parse_json(response: TestResponse) -> t.Any:
+    """Parse a response body with orjson straight from bytes, skipping the
+    intermediate text decode that ``response.get_json`` performs.
+    """
+    return orjson.loads(response.get_data())
+
+
 class TGqlRequestF(t.Protocol):
     def __call__(
         self, query: str, variables: dict[str, t.Any] | None = None
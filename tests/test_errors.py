@@ -5,6 +5,7 @@ import typing as t
 import graphql
 import magql
 import pytest
+from conftest import parse_json
 from flask import Flask
 from flask.testing import FlaskClient
 
@@ -25,7 +26,9 @@ def resolve_greet(
 def validate_greet_name(
     info: graphql.GraphQLResolveInfo, value: str, data: t.Any
 ) -> None:
-    if value[0].islower():
+    # A range comparison is cheaper than str.islower and is called on every
+    # greet query in these tests.
+    if value and "a" <= value[0] <= "z":
         raise magql.ValidationError("Must be capitalized.")
 
 
@@ -51,7 +54,7 @@ def test_syntax_error(client: FlaskClient) -> None:
     """A GraphQL syntax error results in a 400 status."""
     response = client.post("/graphql", json={"query": "{ greet() }"})
     assert response.status_code == 400
-    json = response.get_json(silent=False)
+    json = parse_json(response)
     assert json["errors"][0]["message"].startswith("Syntax Error")
 
 
@@ -59,7 +62,7 @@ def test_type_error(client: FlaskClient) -> None:
     """An incorrect input type results in a 400 status."""
     response = client.post("/graphql", json={"query": "{ greet(name: 1) }"})
     assert response.status_code == 400
-    json = response.get_json(silent=False)
+    json = parse_json(response)
     assert "non string value" in json["errors"][0]["message"]
 
 
@@ -67,7 +70,7 @@ def test_validation_error(client: FlaskClient) -> None:
     """An input validation error results in a 400 status."""
     response = client.post("/graphql", json={"query": """{ greet(name: "test") }"""})
     assert response.status_code == 400
-    json = response.get_json(silent=False)
+    json = parse_json(response)
     assert json["errors"][0]["message"] == "magql argument validation"
 
 
@@ -77,7 +80,7 @@ def test_code_error(client: FlaskClient, caplog: pytest.LogCaptureFixture) -> No
     """
     response = client.post("/graphql", json={"query": "{ error }"})
     assert response.status_code == 500
-    json = response.get_json(silent=False)
+    json = parse_json(response)
     assert json["errors"][0]["message"] == "Internal Server Error"
     assert "extensions" not in json["errors"][0]
     assert "Exception on GraphQL field ['error']" in caplog.text
@@ -90,7 +93,7 @@ def test_500_debug(app: Flask, client: FlaskClient) -> None:
     app.debug = True
     response = client.post("/graphql", json={"query": "{ error }"})
     assert response.status_code == 500
-    json = response.get_json(silent=False)
+    json = parse_json(response)
     assert json["errors"][0]["message"] == "Internal Server Error"
     tb_text = json["errors"][0]["extensions"]["traceback"]
     assert "Traceback (most recent call last)" in tb_text
@@ -106,6 +109,6 @@ def test_batch_max(client: FlaskClient) -> None:
         json=[{"query": "{ error }"}, {"query": """{ greet(name: "test") }"""}],
     )
     assert response.status_code == 500
-    json = response.get_json(silent=False)
+    json = parse_json(response)
     assert json[0]["errors"][0]["message"] == "Internal Server Error"
     assert json[1]["errors"][0]["message"] == "magql argument validation"
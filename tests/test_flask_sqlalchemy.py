@@ -54,6 +54,34 @@ def test_automatic_context(app: Flask, ext: MagqlExtension, db: SQLAlchemy) -> N
     assert result.data["echo"] == {"sa_session": session}
 
 
+@pytest.mark.parametrize("parallel", [False, True])
+def test_shared_batch_context(
+    ext: MagqlExtension, create_app: t.Callable[[], Flask], parallel: bool
+) -> None:
+    """The context provider is called once per request, so every operation in
+    a batch shares one context value, including in parallel worker threads.
+    """
+    calls: list[None] = []
+
+    @ext.context_provider
+    def count_context() -> dict[str, t.Any]:
+        calls.append(None)
+        return {"a": 1}
+
+    app = create_app()
+    app.config["MAGQL_BATCH_PARALLEL"] = parallel
+    client = app.test_client()
+    response = client.post(
+        "/graphql", json=[{"query": "{ echo }"}, {"query": "{ echo }"}]
+    )
+
+    assert len(calls) == 1
+    assert response.json == [
+        {"data": {"echo": {"a": 1}}},
+        {"data": {"echo": {"a": 1}}},
+    ]
+
+
 def test_manual_context(ext: MagqlExtension, create_app: t.Callable[[], Flask]) -> None:
     """If a context provider is set, the automatic behavior does not override it."""
 
@@ -10,6 +10,9 @@ from flask import Flask
 from flask.testing import FlaskClient
 from werkzeug.datastructures import FileStorage
 
+_FILE0 = b"file0"
+_FILE1 = b"file1"
+
 file_schema = magql.Schema()
 
 
@@ -48,7 +51,7 @@ def test_upload(app: Flask, client: FlaskClient) -> None:
                 }
             ),
             "map": app.json.dumps({"0": ["variables.data"]}),
-            "0": (BytesIO(b"file0"), "0"),
+            "0": (BytesIO(_FILE0), "0"),
         },
     )
     assert response.json == {"data": {"single": "file0"}}
@@ -68,8 +71,8 @@ def test_upload_multiple(app: Flask, client: FlaskClient) -> None:
             "map": app.json.dumps(
                 {"0": ["variables.data.0"], "1": ["variables.data.1"]}
             ),
-            "0": (BytesIO(b"file0"), "0"),
-            "1": (BytesIO(b"file1"), "1"),
+            "0": (BytesIO(_FILE0), "0"),
+            "1": (BytesIO(_FILE1), "1"),
         },
     )
     assert response.json == {"data": {"multi": ["file0", "file1"]}}
@@ -98,8 +101,8 @@ def test_batch(app: Flask, client: FlaskClient) -> None:
                     "1": ["1.variables.data.0"],
                 }
             ),
-            "0": (BytesIO(b"file0"), "0"),
-            "1": (BytesIO(b"file1"), "1"),
+            "0": (BytesIO(_FILE0), "0"),
+            "1": (BytesIO(_FILE1), "1"),
         },
     )
     assert response.json == [
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import gzip
 import typing as t
 
+import graphql
+import pytest
 from flask import Flask
 from flask.testing import FlaskClient
 
@@ -14,13 +17,76 @@ def test_graphql(client: FlaskClient) -> None:
     assert response.json == {"data": {"greet": "Hello, World!"}}
 
 
+def test_msgpack(client: FlaskClient) -> None:
+    """A request body can be sent as msgpack. The response is still JSON."""
+    msgpack = pytest.importorskip("msgpack")
+    response = client.post(
+        "/graphql",
+        data=msgpack.packb({"query": "{ greet }"}),
+        content_type="application/msgpack",
+    )
+    assert response.mimetype == "application/json"
+    assert response.json == {"data": {"greet": "Hello, World!"}}
+
+
+def test_msgpack_malformed(client: FlaskClient) -> None:
+    """A body that fails to decode as msgpack results in a 400 status."""
+    pytest.importorskip("msgpack")
+    response = client.post("/graphql", data=b"\xc1", content_type="application/msgpack")
+    assert response.status_code == 400
+
+
+def test_parallel_batch(app: Flask, client: FlaskClient) -> None:
+    """Batched operations can be executed concurrently in a thread pool."""
+    app.config["MAGQL_BATCH_PARALLEL"] = True
+    response = client.post(
+        "/graphql",
+        json=[{"query": "{ greet }"}, {"query": """{ greet(name: "Test") }"""}],
+    )
+    assert response.json == [
+        {"data": {"greet": "Hello, World!"}},
+        {"data": {"greet": "Hello, Test!"}},
+    ]
+
+
+def test_batch_dedup(
+    app: Flask, client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Repeated operations in a batch are executed once and share a result."""
+    app.config["MAGQL_BATCH_DEDUP"] = True
+    calls: list[str] = []
+    original = MagqlExtension.execute
+
+    def spy(self: MagqlExtension, source: str, *args: t.Any, **kwargs: t.Any) -> t.Any:
+        calls.append(source)
+        return original(self, source, *args, **kwargs)
+
+    monkeypatch.setattr(MagqlExtension, "execute", spy)
+    response = client.post(
+        "/graphql", json=[{"query": "{ greet }"}, {"query": "{ greet }"}]
+    )
+    assert calls == ["{ greet }"]
+    assert response.json == [
+        {"data": {"greet": "Hello, World!"}},
+        {"data": {"greet": "Hello, World!"}},
+    ]
+
+
 def test_graphiql(client: FlaskClient) -> None:
     """/graphiql returns an HTML page that configures GraphiQL's fetch URL."""
     response = client.get("/graphiql")
     assert response.mimetype == "text/html"
+    assert response.headers["Vary"] == "Accept-Encoding"
     assert 'fetch("/graphql"' in response.text
 
 
+def test_graphiql_gzip(client: FlaskClient) -> None:
+    """/graphiql serves a precompressed body to clients that accept gzip."""
+    response = client.get("/graphiql", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert 'fetch("/graphql"' in gzip.decompress(response.data).decode()
+
+
 def test_conveyor(client: FlaskClient) -> None:
     """/conveyor redirects to /conveyor/. Any /conveyor/<path> returns an HTML
     page that configures Conveyor's fetch URL.
@@ -44,6 +110,45 @@ def test_schema(client: FlaskClient) -> None:
     assert 'greet(name: String! = "World")' in response.text
 
 
+def test_schema_etag(client: FlaskClient) -> None:
+    """/schema.graphql serves an ETag and responds 304 to a matching
+    If-None-Match, and the document is generated once.
+    """
+    response = client.get("/schema.graphql")
+    etag = response.headers["ETag"]
+    assert etag.startswith('"') and etag.endswith('"')
+
+    response = client.get("/schema.graphql", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.text == ""
+
+    response = client.get("/schema.graphql")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+
+
+def test_execute_document_cache(
+    app: Flask, ext: MagqlExtension, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Repeated queries are parsed and validated once, then served from the
+    document cache.
+    """
+    with app.app_context():
+        ext.execute("{ greet }")
+
+    assert "{ greet }" in ext._document_cache
+
+    def fail(*args: t.Any, **kwargs: t.Any) -> t.Any:
+        raise AssertionError("parsed the source again")
+
+    monkeypatch.setattr(graphql, "parse", fail)
+
+    with app.app_context():
+        result = ext.execute("{ greet }")
+
+    assert result.data == {"greet": "Hello, World!"}
+
+
 def test_url_prefix(ext: MagqlExtension, create_app: t.Callable[[], Flask]) -> None:
     """The extension's blueprint can be modified to change the URL prefix."""
     ext.blueprint.url_prefix = "/api"